@@ -4,117 +4,368 @@ import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import numpy as np
-from functools import lru_cache
+import re
+import json
+import os
+import threading
 import time
+import warnings
+from functools import lru_cache
 import asyncio
 import aiohttp
-from bs4 import BeautifulSoup
+from lxml import etree, html as lhtml
 
-# Cache expensive computations
-@lru_cache(maxsize=128)
-def _cached_numeric_conversion(series_str):
-    """Cache numeric conversions for repeated operations"""
-    return pd.to_numeric(series_str, errors='coerce')
+# Opt-in extra, not in requirements.txt: `pip install numba` to compile the analytics kernel
+try:
+    from numba import njit
+except ImportError:  # Numba is optional; the NumPy path is used without it
+    njit = None
 
-@st.cache_data(ttl=600)  # Cache individual results for 10 minutes
-def fetch_individual_student_result(base_url, registration_no):
-    """Fetch detailed result for a specific student"""
-    try:
-        import requests
-        url = f"{base_url}{registration_no}"
-        
-        # Create session with timeout
-        session = requests.Session()
-        session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        })
-        
-        response = session.get(url, timeout=10)
-        response.raise_for_status()
+# Opt-in extra, not in requirements.txt: `pip install diskcache` to persist fetched pages
+try:
+    import diskcache
+except ImportError:  # diskcache is optional; pages are always fetched without it
+    diskcache = None
+
+# Opt-in extra, not in requirements.txt: `pip install orjson` for faster JSON hashing and export
+try:
+    import orjson
+except ImportError:  # orjson is optional; the stdlib json module is used without it
+    orjson = None
+
+_DETAIL_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+}
+
+# Raw result pages persisted across sessions, keyed by "base_url|registration_no". Anchored to
+# this file, not the working directory: analytics is imported before app.py changes directory
+_PAGE_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache', 'http')
+_PAGE_CACHE = None
+_PAGE_CACHE_LOCK = threading.Lock()
+_PAGE_CACHE_TTL = 86400
+
+def _page_cache():
+    """Open the on-disk page cache on first use, so importing this module touches no files"""
+    global _PAGE_CACHE
+    if diskcache is None:
+        return None
+    with _PAGE_CACHE_LOCK:
+        if _PAGE_CACHE is None:
+            _PAGE_CACHE = diskcache.Cache(_PAGE_CACHE_DIR)
+    return _PAGE_CACHE
+
+# Compiled once at import: one walk collects every DataList label on the page
+_XP_LABELS = etree.XPath("//*[starts-with(@id, 'ContentPlaceHolder1_DataList')]")
+_XP_SEMESTER_ROWS = etree.XPath("//table[@id='ContentPlaceHolder1_GridView3']//tr")
+_XP_SUBJECT_ROWS = etree.XPath("//table[@id='ContentPlaceHolder1_GridView1']//tr")
+_XP_HEADER_CELLS = etree.XPath("./th")
+_XP_VALUE_CELLS = etree.XPath("./td")
+_XP_CELLS = etree.XPath("./th|./td")
+
+_STUDENT_INFO_IDS = {
+    "Registration No.": "ContentPlaceHolder1_DataList1_RegistrationNoLabel_0",
+    "Student Name": "ContentPlaceHolder1_DataList1_StudentNameLabel_0",
+    "Father's Name": "ContentPlaceHolder1_DataList1_FatherNameLabel_0",
+    "Mother's Name": "ContentPlaceHolder1_DataList1_MotherNameLabel_0",
+    "College Name": "ContentPlaceHolder1_DataList1_CollegeNameLabel_0",
+    "Branch": "ContentPlaceHolder1_DataList1_BranchLabel_0",
+    "Semester": "ContentPlaceHolder1_DataList1_SemesterLabel_0",
+    "Current SGPA": "ContentPlaceHolder1_DataList5_GROSSTHEORYTOTALLabel_0",
+    "Current CGPA": "ContentPlaceHolder1_DataList5_Label1_0"
+}
+
+def _texts(elements):
+    """Stripped text content of each element"""
+    return [el.text_content().strip() for el in elements]
+
+def _parse_detailed_html(html, registration_no):
+    """Parse a student's result page into student/semester/subject sections"""
+    tree = lhtml.fromstring(html)
+    labels = {el.get('id'): el.text_content().strip() for el in _XP_LABELS(tree)}
+    
+    # Check if valid result page
+    if _STUDENT_INFO_IDS["Registration No."] not in labels:
+        return None
         
-        soup = BeautifulSoup(response.text, "lxml")
+    # Extract detailed student information
+    student_info = {field: labels.get(el_id, "N/A") for field, el_id in _STUDENT_INFO_IDS.items()}
+    
+    # Extract semester-wise results from the grid
+    semester_results = []
+    rows = _XP_SEMESTER_ROWS(tree)
+    if len(rows) >= 2:
+        headers = _texts(_XP_HEADER_CELLS(rows[0]))
+        values = _texts(_XP_VALUE_CELLS(rows[1]))
         
-        # Check if valid result page
-        if not soup.select_one("#ContentPlaceHolder1_DataList1_RegistrationNoLabel_0"):
-            return None
-            
-        # Extract detailed student information
-        student_info = {
-            "Registration No.": _safe_extract_text(soup, "#ContentPlaceHolder1_DataList1_RegistrationNoLabel_0", str(registration_no)),
-            "Student Name": _safe_extract_text(soup, "#ContentPlaceHolder1_DataList1_StudentNameLabel_0"),
-            "Father's Name": _safe_extract_text(soup, "#ContentPlaceHolder1_DataList1_FatherNameLabel_0"),
-            "Mother's Name": _safe_extract_text(soup, "#ContentPlaceHolder1_DataList1_MotherNameLabel_0"),
-            "College Name": _safe_extract_text(soup, "#ContentPlaceHolder1_DataList1_CollegeNameLabel_0"),
-            "Branch": _safe_extract_text(soup, "#ContentPlaceHolder1_DataList1_BranchLabel_0"),
-            "Semester": _safe_extract_text(soup, "#ContentPlaceHolder1_DataList1_SemesterLabel_0"),
-            "Current SGPA": _safe_extract_text(soup, "#ContentPlaceHolder1_DataList5_GROSSTHEORYTOTALLabel_0"),
-            "Current CGPA": _safe_extract_text(soup, "#ContentPlaceHolder1_DataList5_Label1_0")
-        }
+        for header, value in zip(headers, values):
+            if header and value:
+                semester_results.append({
+                    "Semester": header,
+                    "Grade/SGPA": value
+                })
+    
+    # Extract subject-wise results if available
+    subject_results = []
+    rows = _XP_SUBJECT_ROWS(tree)
+    if len(rows) > 1:
+        headers = _texts(_XP_CELLS(rows[0]))
         
-        # Extract semester-wise results from the grid
-        semester_results = []
-        grid_table = soup.select_one("#ContentPlaceHolder1_GridView3")
-        if grid_table:
-            rows = grid_table.select("tr")
-            if len(rows) >= 2:
-                headers = [th.get_text(strip=True) for th in rows[0].find_all("th")]
-                values = [td.get_text(strip=True) for td in rows[1].find_all("td")]
-                
-                for header, value in zip(headers, values):
-                    if header and value:
-                        semester_results.append({
-                            "Semester": header,
-                            "Grade/SGPA": value
-                        })
+        for row in rows[1:]:
+            cells = _texts(_XP_CELLS(row))
+            if len(cells) >= len(headers):
+                subject_data = dict(zip(headers, cells))
+                if subject_data:
+                    subject_results.append(subject_data)
+    
+    return {
+        "student_info": student_info,
+        "semester_results": semester_results,
+        "subject_results": subject_results
+    }
+
+async def _fetch_one(session, sem, url):
+    """GET a single result page under the shared concurrency limit"""
+    async with sem:
+        async with session.get(url, timeout=aiohttp.ClientTimeout(total=10)) as response:
+            response.raise_for_status()
+            return await response.text()
+
+async def fetch_student_results_bulk(base_url, reg_nos, max_concurrent=16):
+    """Fetch and parse detailed results for many students concurrently.
+
+    Returns a dict mapping each registration number to its parsed result
+    (None when the page could not be fetched or holds no result).
+    """
+    # Serve previously seen pages from disk; only the misses go over the network
+    page_cache = _page_cache()
+    fetched = []
+    missing = list(reg_nos)
+    if page_cache is not None:
+        missing = []
+        for reg_no in reg_nos:
+            page = page_cache.get(f"{base_url}|{reg_no}")
+            if page is None:
+                missing.append(reg_no)
+            else:
+                fetched.append((reg_no, page))
+    
+    connector = aiohttp.TCPConnector(limit=32, ttl_dns_cache=300)
+    sem = asyncio.Semaphore(max_concurrent)
+    async with aiohttp.ClientSession(connector=connector, headers=_DETAIL_HEADERS) as session:
+        pages = await asyncio.gather(
+            *[_fetch_one(session, sem, f"{base_url}{reg_no}") for reg_no in missing],
+            return_exceptions=True
+        )
         
-        # Extract subject-wise results if available
-        subject_results = []
-        subject_table = soup.select_one("#ContentPlaceHolder1_GridView1")
-        if subject_table:
-            rows = subject_table.select("tr")
-            if len(rows) > 1:
-                # Get headers
-                header_row = rows[0]
-                headers = [th.get_text(strip=True) for th in header_row.find_all(["th", "td"])]
-                
-                # Get data rows
-                for row in rows[1:]:
-                    cells = row.find_all(["td", "th"])
-                    if len(cells) >= len(headers):
-                        subject_data = {}
-                        for i, header in enumerate(headers):
-                            if i < len(cells):
-                                subject_data[header] = cells[i].get_text(strip=True)
-                        if subject_data:
-                            subject_results.append(subject_data)
+        network_pages = {}
+        for reg_no, page in zip(missing, pages):
+            if isinstance(page, BaseException):
+                continue
+            fetched.append((reg_no, page))
+            network_pages[reg_no] = page
         
-        session.close()
-        return {
-            "student_info": student_info,
-            "semester_results": semester_results,
-            "subject_results": subject_results
-        }
+        # Parse off the event loop so page parsing doesn't stall pending reads
+        loop = asyncio.get_running_loop()
+        parsed = await asyncio.gather(*[
+            loop.run_in_executor(None, _parse_detailed_html, page, reg_no)
+            for reg_no, page in fetched
+        ], return_exceptions=True)
+    
+    # A page that fails to parse (empty body, garbage markup) counts as no result
+    results = dict.fromkeys(reg_nos)
+    results.update(
+        (reg_no, None if isinstance(result, Exception) else result)
+        for (reg_no, _), result in zip(fetched, parsed)
+    )
+    
+    # Persist only pages that held a result, so a transient stub or empty body isn't replayed for a day
+    if page_cache is not None:
+        for reg_no, page in network_pages.items():
+            if results[reg_no] is not None:
+                page_cache.set(f"{base_url}|{reg_no}", page, expire=_PAGE_CACHE_TTL)
+    return results
+
+@st.cache_data(ttl=600)  # Cache individual results for 10 minutes
+def fetch_individual_student_result(base_url, registration_no):
+    """Fetch detailed result for a specific student"""
+    try:
+        results = asyncio.run(fetch_student_results_bulk(base_url, [registration_no]))
+        return results[registration_no]
         
     except Exception as e:
         st.error(f"Failed to fetch detailed result: {str(e)}")
         return None
 
-def _safe_extract_text(soup, selector, default="N/A"):
-    """Safely extract text from soup with fallback"""
-    try:
-        element = soup.select_one(selector)
-        return element.get_text(strip=True) if element else default
-    except:
-        return default
+# Leading number in a grade cell, e.g. "8.5" or "8.5 (A)"
+_GRADE_RE = re.compile(r'(\d+\.?\d*)')
 
-@st.cache_data(ttl=300)  # Cache for 5 minutes
-def process_analytics_data(df_records):
-    """Process and cache analytics data for better performance"""
-    # Handle both DataFrame records and string input
-    if isinstance(df_records, str):
-        # If string is passed, we need to reconstruct from the original DataFrame
-        return None  # Signal to use direct DataFrame processing
-    df = pd.DataFrame(df_records)
+# Subject-table columns holding a grade are recognised by these name fragments
+_GRADE_KEYWORDS = ('grade', 'point', 'gp', 'marks')
+
+@lru_cache(maxsize=64)
+def _grade_columns(columns):
+    """Grade-like column names in a subject table, memoized on the column tuple"""
+    return tuple(col for col in columns if any(keyword in col.lower() for keyword in _GRADE_KEYWORDS))
+
+def _find_grade_column(columns):
+    """First grade-like column of a subject table, or None"""
+    grade_columns = _grade_columns(tuple(columns))
+    return grade_columns[0] if grade_columns else None
+
+# SGPA performance buckets: lower bounds of each band and their labels
+_SGPA_BINS = np.array([6.0, 7.0, 8.0, 9.0])
+_SGPA_LABELS = [
+    "Needs Improvement (<6.0)",
+    "Average (6.0-6.9)",
+    "Good (7.0-7.9)",
+    "Very Good (8.0-8.9)",
+    "Excellent (9.0+)",
+    "No Data",
+]
+
+def _sgpa_codes(sgpa):
+    """Vectorized SGPA bucketing into indices of _SGPA_LABELS"""
+    codes = np.searchsorted(_SGPA_BINS, sgpa, side="right")
+    codes[np.isnan(sgpa)] = len(_SGPA_LABELS) - 1
+    return codes
+
+def _semester_reductions(arr):
+    """Per-semester average/highest/lowest/count reduced column-wise over the matrix"""
+    with warnings.catch_warnings():
+        # All-NaN semesters legitimately reduce to NaN
+        warnings.simplefilter("ignore", RuntimeWarning)
+        avg = np.nanmean(arr, axis=0)
+        hi = np.nanmax(arr, axis=0)
+        lo = np.nanmin(arr, axis=0)
+    cnt = np.sum(~np.isnan(arr), axis=0)
+    return avg, hi, lo, cnt
+
+if njit is not None:
+    # Serial on purpose: Streamlit runs each session's script in its own thread and
+    # Numba's default parallel threading layer is not safe to launch from those.
+    # No fastmath either: it assumes NaN-free input and would drop the isnan checks.
+    @njit(cache=True)
+    def _analytics_kernel(sgpa, sem):
+        """Fused SGPA bucketing + per-semester reductions in a single compiled pass"""
+        n, m = sem.shape
+        codes = np.empty(n, np.int8)
+        for i in range(n):
+            s = sgpa[i]
+            if np.isnan(s):
+                codes[i] = 5
+            elif s >= 9.0:
+                codes[i] = 4
+            elif s >= 8.0:
+                codes[i] = 3
+            elif s >= 7.0:
+                codes[i] = 2
+            elif s >= 6.0:
+                codes[i] = 1
+            else:
+                codes[i] = 0
+        
+        avg = np.empty(m, np.float32)
+        hi = np.empty(m, np.float32)
+        lo = np.empty(m, np.float32)
+        cnt = np.empty(m, np.int64)
+        for j in range(m):
+            total = 0.0
+            top = -np.inf
+            bottom = np.inf
+            k = 0
+            for i in range(n):
+                v = sem[i, j]
+                if not np.isnan(v):
+                    total += v
+                    k += 1
+                    if v > top:
+                        top = v
+                    if v < bottom:
+                        bottom = v
+            cnt[j] = k
+            if k > 0:
+                avg[j] = total / k
+                hi[j] = top
+                lo[j] = bottom
+            else:
+                avg[j] = np.nan
+                hi[j] = np.nan
+                lo[j] = np.nan
+        return codes, avg, hi, lo, cnt
+else:
+    def _analytics_kernel(sgpa, sem):
+        """NumPy fallback for the fused bucketing + semester reduction kernel"""
+        return (_sgpa_codes(sgpa), *_semester_reductions(sem))
+
+def _semester_matrix(df, sem_cols):
+    """Parse the semester columns into one contiguous float32 matrix (NaN = no data)"""
+    raw = pd.Series(df[sem_cols].to_numpy(dtype=object).ravel())
+    flat = pd.to_numeric(raw, errors='coerce').to_numpy(dtype=np.float32, na_value=np.nan)
+    return np.ascontiguousarray(flat.reshape(len(df), len(sem_cols)))
+
+def _categorize_and_reduce(df, sem_cols):
+    """SGPA categories, semester matrix and semester statistics from one kernel call"""
+    sgpa = df["Current SGPA"].to_numpy(dtype=np.float64)
+    sem_matrix = _semester_matrix(df, sem_cols)
+    codes, avg, hi, lo, cnt = _analytics_kernel(sgpa, sem_matrix)
+    categories = pd.Categorical.from_codes(codes, categories=_SGPA_LABELS)
+    
+    if not sem_cols:
+        return categories, None, None
+    sem_stats = pd.DataFrame({
+        'Semester': [col.replace("Sem ", "") for col in sem_cols],
+        'Average': avg,
+        'Highest': hi,
+        'Lowest': lo,
+        'Students': cnt
+    })
+    return categories, sem_matrix, sem_stats
+
+def _k_smallest(vals, k):
+    """Row positions of the k smallest non-NaN values, ties broken by row order"""
+    idx = np.flatnonzero(~np.isnan(vals))
+    if len(idx) > k:
+        v = vals[idx]
+        # O(N) selection of the k-th value instead of a full sort
+        kth = np.partition(v, k - 1)[k - 1]
+        below = v < kth
+        idx = np.concatenate([idx[below], idx[v == kth][:k - np.count_nonzero(below)]])
+        idx.sort()
+    return idx[np.argsort(vals[idx], kind='stable')]
+
+def _top_bottom_performers(df, k=10):
+    """Top and bottom k students by SGPA, selected on the raw float array"""
+    cols = ["Student Name", "Registration No.", "Current SGPA"]
+    vals = df["Current SGPA"].to_numpy(dtype=np.float64)
+    return df.iloc[_k_smallest(-vals, k)][cols], df.iloc[_k_smallest(vals, k)][cols]
+
+# Identity columns stay text (Arrow-backed): they are unique per student and searched/matched on
+_IDENTITY_COLS = ("Registration No.", "Student Name", "Father's Name", "Mother's Name")
+
+def _downcast_low_cardinality(df):
+    """Convert repeated text columns (e.g. Branch) to category dtype in place"""
+    for col in df.columns:
+        series = df[col]
+        if col in _IDENTITY_COLS or isinstance(series.dtype, pd.CategoricalDtype) or pd.api.types.is_numeric_dtype(series):
+            continue
+        if series.nunique(dropna=True) <= len(series) // 2:
+            df[col] = series.astype('category')
+
+def _name_positions(df):
+    """Row positions per student name (a list, since names can repeat)"""
+    name_to_pos = {}
+    for pos, name in enumerate(df["Student Name"].to_numpy()):
+        name_to_pos.setdefault(name, []).append(pos)
+    return name_to_pos
+
+def _hash_frame(df):
+    """Cheap content hash for DataFrame cache keys (C-level, no Python row objects)"""
+    return (tuple(df.columns), pd.util.hash_pandas_object(df, index=False).values.tobytes())
+
+def _compute_analytics(df):
+    """Build the analytics artifacts for a results frame (uncached)"""
+    # Work on a fresh copy so the caller's frame is never mutated
+    df = df.reset_index(drop=True)
     
     # Convert SGPA to numeric once
     df["Current SGPA"] = pd.to_numeric(df["Current SGPA"], errors='coerce')
@@ -122,93 +373,387 @@ def process_analytics_data(df_records):
     # Get semester columns
     sem_cols = [col for col in df.columns if col.startswith("Sem ")]
     
-    # Pre-calculate performance categories
-    def grade_bucket(sgpa):
-        if pd.isna(sgpa): return "No Data"
-        elif sgpa >= 9: return "Excellent (9.0+)"
-        elif sgpa >= 8: return "Very Good (8.0-8.9)"
-        elif sgpa >= 7: return "Good (7.0-7.9)"
-        elif sgpa >= 6: return "Average (6.0-6.9)"
-        else: return "Needs Improvement (<6.0)"
-
-    df["SGPA Category"] = df["Current SGPA"].apply(grade_bucket)
-    
-    # Pre-calculate semester statistics if available
-    sem_stats = None
-    if sem_cols:
-        sem_df = df[sem_cols].apply(pd.to_numeric, errors="coerce")
-        sem_stats = pd.DataFrame({
-            'Semester': [col.replace("Sem ", "") for col in sem_cols],
-            'Average': sem_df.mean().values,
-            'Highest': sem_df.max().values,
-            'Lowest': sem_df.min().values,
-            'Students': sem_df.count().values
-        })
+    # Pre-calculate performance categories and semester statistics (if available)
+    df["SGPA Category"], sem_matrix, sem_stats = _categorize_and_reduce(df, sem_cols)
+    
+    # Arrow-backed strings for identity columns, dictionary-encoded repeated text
+    for col in _IDENTITY_COLS:
+        if col in df.columns:
+            df[col] = df[col].astype('string[pyarrow]')
+    _downcast_low_cardinality(df)
     
     # Pre-calculate top and bottom performers
-    top_performers = df.nlargest(10, "Current SGPA")[["Student Name", "Registration No.", "Current SGPA"]]
-    bottom_performers = df.nsmallest(10, "Current SGPA")[["Student Name", "Registration No.", "Current SGPA"]]
+    top_performers, bottom_performers = _top_bottom_performers(df)
     
     return {
         'df': df,
         'sem_cols': sem_cols,
+        'sem_matrix': sem_matrix,
         'sem_stats': sem_stats,
         'top_performers': top_performers,
-        'bottom_performers': bottom_performers
+        'bottom_performers': bottom_performers,
+        'name_to_pos': _name_positions(df),
+        'computed_at': time.time()  # Older than this run's start when served from cache
+    }
+
+@st.cache_data(ttl=300, hash_funcs={pd.DataFrame: _hash_frame})  # Cache for 5 minutes
+def process_analytics_data(df):
+    """Process and cache analytics data for better performance"""
+    return _compute_analytics(df)
+
+@st.cache_data(ttl=600)
+def _overview_stats(df_hash, _df):
+    """Summary metrics and category breakdown, cached on the frame's content hash"""
+    sgpa = _df["Current SGPA"]
+    category_counts = _df["SGPA Category"].value_counts()
+    return {
+        'n': len(_df),
+        'mean': sgpa.mean(),
+        'max': sgpa.max(),
+        'min': sgpa.min(),
+        'cat_counts': category_counts[category_counts > 0],
+        'cats': tuple(_df["SGPA Category"].unique()),
+        # Lowercased once so name search is a plain substring scan per keystroke
+        'names_lower': np.char.lower(_df["Student Name"].fillna("").to_numpy(dtype=str))
     }
 
+def _payload_hash(detailed_result):
+    """Content hash of a fetched detailed result, stable for the life of the process"""
+    if orjson is not None:
+        return hash(orjson.dumps(detailed_result, option=orjson.OPT_SORT_KEYS, default=str))
+    return hash(json.dumps(detailed_result, sort_keys=True, default=str))
+
+@st.cache_data(max_entries=256)
+def _subject_df(reg_no, payload_hash, _subject_results):
+    """Subject-results table for one student, built once per fetched payload"""
+    return pd.DataFrame(_subject_results)
+
+@st.cache_data(max_entries=64)
+def _dump_detailed(reg_no, payload):
+    """UTF-8 JSON export of a detailed result, encoded once per payload"""
+    if orjson is not None:
+        return orjson.dumps(payload, option=orjson.OPT_INDENT_2, default=str)
+    return json.dumps(payload, indent=2, ensure_ascii=False).encode('utf-8')
+
+@st.cache_data(ttl="15m", max_entries=32)
+def _compute_subject_rankings(results_key, selected_student, _all_detailed_results):
+    """Per-subject rankings across fetched students, cached on the detailed-results fingerprint"""
+    # Stack every student's numeric subject grades into (subject, student, grade) rows
+    frames = []
+    
+    payload_hashes = dict(results_key)
+    for student_name, detailed_data in _all_detailed_results.items():
+        if detailed_data and 'subject_results' in detailed_data and detailed_data['subject_results']:
+            subject_df = _subject_df(
+                detailed_data.get('student_info', {}).get('Registration No.'),
+                payload_hashes[student_name],
+                detailed_data['subject_results']
+            )
+            
+            grade_col = _find_grade_column(subject_df.columns)
+            
+            if grade_col is not None:
+                subject_col = subject_df.columns[0]  # Assume first column is subject name
+                
+                grades = pd.DataFrame({
+                    'Subject': subject_df[subject_col],
+                    'Student': student_name,
+                    'Grade': pd.to_numeric(subject_df[grade_col], errors='coerce')
+                })
+                frames.append(grades.dropna(subset=['Grade']))
+    
+    if frames:
+        subject_rankings = pd.concat(frames, ignore_index=True)
+    else:
+        subject_rankings = pd.DataFrame(columns=['Subject', 'Student', 'Grade'])
+    
+    # Only rank subjects taken by multiple students
+    subject_rankings['Size'] = subject_rankings.groupby('Subject', sort=False)['Grade'].transform('size')
+    subject_rankings = subject_rankings[subject_rankings['Size'] > 1].copy()
+    if subject_rankings.empty:
+        return [], subject_rankings
+    
+    # One grouped rank for all subjects; tied grades share the better rank
+    by_subject = subject_rankings.groupby('Subject', sort=False)['Grade']
+    subject_rankings['Rank'] = by_subject.rank(method='min', ascending=False).astype(int)
+    toppers = subject_rankings.loc[by_subject.idxmax()].set_index('Subject')
+    
+    # Selected student's rows, in order of each subject's first appearance
+    mine = subject_rankings[subject_rankings['Student'] == selected_student]
+    mine = mine.iloc[np.argsort(toppers.index.get_indexer(mine['Subject']), kind='stable')]
+    topper_grades = toppers['Grade'].reindex(mine['Subject']).to_numpy()
+    size = mine['Size'].to_numpy()
+    rank = mine['Rank'].to_numpy()
+    
+    # Numeric fields stay numeric; formatting is left to the table's column config
+    current_student_rankings = pd.DataFrame({
+        'Subject': mine['Subject'].to_numpy(),
+        'Your Grade': mine['Grade'].to_numpy(),
+        'Your Rank': rank,
+        'Out Of': size,
+        'Topper Grade': topper_grades,
+        'Topper': toppers['Student'].reindex(mine['Subject']).to_numpy(),
+        'Gap': topper_grades - mine['Grade'].to_numpy(),
+        'Percentile': (size - rank + 1) / size * 100
+    }).to_dict('records')
+    
+    return current_student_rankings, subject_rankings
+
+@st.cache_resource(max_entries=16)
+def _build_trend_fig(columns, rows):
+    """Semester-wise grade trend chart, built once per semester-statistics payload"""
+    sem_stats = pd.DataFrame.from_records(rows, columns=columns)
+    trend = sem_stats.melt(
+        id_vars='Semester', value_vars=['Average', 'Highest', 'Lowest'],
+        var_name='Series', value_name='Grade'
+    )
+    fig_trend = px.line(
+        trend, x='Semester', y='Grade', color='Series', markers=True,
+        color_discrete_map={'Average': 'blue', 'Highest': 'green', 'Lowest': 'red'}
+    )
+    fig_trend.update_traces(line=dict(width=2))
+    fig_trend.update_traces(selector={'name': 'Average'}, line=dict(width=3))
+    
+    fig_trend.update_layout(
+        title="Semester-wise Grade Trends",
+        xaxis_title="Semester",
+        yaxis_title="Grade",
+        yaxis=dict(range=[0, 10])
+    )
+    return fig_trend
+
+@st.cache_resource(max_entries=16)
+def _build_subject_comparison_fig(subjects, your_grades, topper_grades):
+    """Grouped bars of the student's grade against the topper's, per subject"""
+    subjects = np.asarray(subjects, dtype=object)
+    fig_subject_comparison = go.Figure()
+    
+    fig_subject_comparison.add_trace(go.Bar(
+        name='Your Grade',
+        x=subjects,
+        y=your_grades,
+        marker_color='lightblue',
+        texttemplate='%{y:.1f}',
+        textposition='auto',
+    ))
+    
+    fig_subject_comparison.add_trace(go.Bar(
+        name='Topper Grade',
+        x=subjects,
+        y=topper_grades,
+        marker_color='gold',
+        texttemplate='%{y:.1f}',
+        textposition='auto',
+    ))
+    
+    fig_subject_comparison.update_layout(
+        title='Subject-wise Grade Comparison (You vs Topper)',
+        xaxis_title='Subjects',
+        yaxis_title='Grades',
+        barmode='group',
+        xaxis_tickangle=-45
+    )
+    return fig_subject_comparison
+
+@st.cache_resource(max_entries=16)
+def _build_rank_fig(subjects, ranks):
+    """Rank per subject, with podium colours and marker sizes"""
+    rank_arr = np.asarray(ranks)
+    rank_sizes = np.select([rank_arr == 1, rank_arr <= 3], [20, 15], default=10)
+    rank_colors = np.select(
+        [rank_arr == 1, rank_arr == 2, rank_arr == 3],
+        ['gold', 'silver', '#cd7f32'],
+        default='lightcoral'
+    )
+    fig_ranks = go.Figure(data=go.Scatter(
+        x=subjects,
+        y=ranks,
+        mode='markers+lines',
+        marker=dict(
+            size=rank_sizes,
+            color=rank_colors,
+            line=dict(width=2, color='darkblue')
+        ),
+        text=[f'Rank {r}' for r in ranks],
+        textposition='top center'
+    ))
+    
+    fig_ranks.update_layout(
+        title='Your Subject-wise Rankings',
+        xaxis_title='Subjects',
+        yaxis_title='Rank Position',
+        yaxis=dict(autorange='reversed'),  # Lower rank number = better position
+        xaxis_tickangle=-45
+    )
+    return fig_ranks
+
+@st.cache_resource(max_entries=16)
+def _build_grade_distribution_fig(subjects, grades, grade_col):
+    """Colour-banded bar chart of one student's subject grades"""
+    # Color code based on performance
+    subjects = np.asarray(subjects, dtype=object)
+    grade_arr = np.asarray(grades)
+    colors = np.select(
+        [grade_arr >= 9, grade_arr >= 8, grade_arr >= 7],
+        ['gold', 'lightgreen', 'orange'],
+        default='lightcoral'
+    )
+    
+    fig_subjects = go.Figure(data=[
+        go.Bar(
+            x=subjects,
+            y=grades,
+            marker_color=colors,
+            texttemplate='%{y:.1f}',
+            textposition='auto',
+        )
+    ])
+    
+    fig_subjects.update_layout(
+        title=f"Subject-wise {grade_col} Distribution",
+        xaxis_title="Subjects",
+        yaxis_title=grade_col,
+        xaxis_tickangle=-45,
+        showlegend=False
+    )
+    return fig_subjects
+
+def _render_subject_rank_tab(selected_student, df_work, name_to_pos):
+    """Subject-wise rankings tab; the aggregation and its charts are served from cache on reruns"""
+    # True subject-wise ranking from detailed results
+    st.info("📚 **Individual subject rankings** based on detailed scraped results. Click 'Fetch Detailed Result' first to see subject-wise rankings.")
+    
+    # Count fetched results first; with fewer than two there is nothing to rank
+    fetched_count = sum(1 for key in st.session_state.keys() if key.startswith('detailed_result_'))
+    all_detailed_results = {}
+    if fetched_count > 1:
+        # Check which students in this batch have detailed results to compare with
+        # (a repeated name maps to its first registration number)
+        reg_nos = df_work["Registration No."].to_numpy()
+        reg_map = {name: reg_nos[positions[0]] for name, positions in name_to_pos.items()}
+        for other_student, other_reg_no in reg_map.items():
+            other_detailed = st.session_state.get(f'detailed_result_{other_reg_no}')
+            if other_detailed is not None:
+                all_detailed_results[other_student] = other_detailed
+        fetched_count = len(all_detailed_results)
+    
+    if fetched_count > 1:
+        st.success(f"📊 Found detailed results for {fetched_count} students. Calculating subject-wise rankings...")
+        
+        # Aggregation is cached until the set of fetched results changes
+        results_key = tuple(sorted(
+            (name, _payload_hash(dr))
+            for name, dr in all_detailed_results.items()
+        ))
+        current_student_rankings, subject_rankings = _compute_subject_rankings(
+            results_key, selected_student, all_detailed_results
+        )
+        
+        if not subject_rankings.empty:
+            if current_student_rankings:
+                st.markdown("##### 🏆 Your Subject-wise Rankings")
+                ranking_df = pd.DataFrame.from_records(current_student_rankings)
+                st.dataframe(
+                    ranking_df,
+                    width='stretch',
+                    hide_index=True,
+                    column_config={
+                        "Your Grade": st.column_config.NumberColumn(format="%.2f"),
+                        "Topper Grade": st.column_config.NumberColumn(format="%.2f"),
+                        "Gap": st.column_config.NumberColumn(format="%.2f"),
+                        "Percentile": st.column_config.ProgressColumn(min_value=0, max_value=100, format="%.1f%%")
+                    }
+                )
+                
+                # Subject-wise performance visualization
+                if len(current_student_rankings) > 0:
+                    # Column arrays straight from the table shown above
+                    subjects = ranking_df['Subject'].to_numpy()
+                    your_grades = ranking_df['Your Grade'].to_numpy()
+                    topper_grades = ranking_df['Topper Grade'].to_numpy()
+                    rank_arr = ranking_df['Your Rank'].to_numpy()
+                    
+                    # Figures are cached on the chart inputs
+                    st.plotly_chart(
+                        _build_subject_comparison_fig(tuple(subjects), your_grades, topper_grades),
+                        width='stretch'
+                    )
+                    st.plotly_chart(_build_rank_fig(tuple(subjects), rank_arr), width='stretch')
+                    
+                    # Performance summary
+                    st.markdown("##### 📊 Subject-wise Performance Summary")
+                    
+                    rank_1 = int(np.count_nonzero(rank_arr == 1))
+                    rank_top3 = int(np.count_nonzero(rank_arr <= 3))
+                    rank_top50 = int(np.count_nonzero(rank_arr <= len(rank_arr) * 0.5))
+                    
+                    col1, col2, col3, col4 = st.columns(4)
+                    col1.metric("🥇 First Position", rank_1)
+                    col2.metric("🏆 Top 3 Positions", rank_top3)
+                    col3.metric("📊 Top 50%", rank_top50)
+                    col4.metric("📈 Total Subjects", len(rank_arr))
+                    
+                    # Best and worst subjects
+                    best_subject_idx = int(rank_arr.argmin())
+                    worst_subject_idx = int(rank_arr.argmax())
+                    
+                    col1, col2 = st.columns(2)
+                    with col1:
+                        st.success(f"""
+                        **🏅 Best Subject:**
+                        - **Subject:** {subjects[best_subject_idx]}
+                        - **Rank:** {rank_arr[best_subject_idx]}
+                        - **Grade:** {your_grades[best_subject_idx]:.2f}
+                        """)
+                    
+                    with col2:
+                        st.warning(f"""
+                        **📈 Improvement Area:**
+                        - **Subject:** {subjects[worst_subject_idx]}
+                        - **Rank:** {rank_arr[worst_subject_idx]}
+                        - **Grade:** {your_grades[worst_subject_idx]:.2f}
+                        - **Gap to Topper:** {topper_grades[worst_subject_idx] - your_grades[worst_subject_idx]:.2f} points
+                        """)
+            else:
+                st.warning("📝 No subject ranking data found for the selected student.")
+        else:
+            st.warning("📝 No comparable subject data found across students.")
+    else:
+        st.warning(f"""
+        📝 **Subject-wise ranking requires detailed results for multiple students.**
+        
+        Currently have detailed results for: {fetched_count} student(s)
+        
+        To see subject-wise rankings:
+        1. Select different students and click 'Fetch Detailed Result' for each
+        2. Return to this student to see comparative subject rankings
+        3. Minimum 2 students with detailed results needed for ranking
+        """)
+
 def show_analytics(df):
     start_time = time.time()
     st.markdown("## 📊 Analytics Summary")
     
-    # Convert DataFrame to dict for caching
-    df_records = df.to_dict('records')
-    
     # Get processed data (cached)
     with st.spinner("⚡ Processing analytics data..."):
-        analytics_data = process_analytics_data(df_records)
+        analytics_data = process_analytics_data(df)
         
         # If caching failed, process directly
         if analytics_data is None:
-            df_work = df.copy()
-            # Process data directly without caching
-            df_work["Current SGPA"] = pd.to_numeric(df_work["Current SGPA"], errors='coerce')
-            
-            # Get semester columns
-            sem_cols = [col for col in df_work.columns if col.startswith("Sem ")]
-            
-            # Pre-calculate performance categories
-            def grade_bucket(sgpa):
-                if pd.isna(sgpa): return "No Data"
-                elif sgpa >= 9: return "Excellent (9.0+)"
-                elif sgpa >= 8: return "Very Good (8.0-8.9)"
-                elif sgpa >= 7: return "Good (7.0-7.9)"
-                elif sgpa >= 6: return "Average (6.0-6.9)"
-                else: return "Needs Improvement (<6.0)"
-
-            df_work["SGPA Category"] = df_work["Current SGPA"].apply(grade_bucket)
-            
-            # Pre-calculate semester statistics if available
-            sem_stats = None
-            if sem_cols:
-                sem_df = df_work[sem_cols].apply(pd.to_numeric, errors="coerce")
-                sem_stats = pd.DataFrame({
-                    'Semester': [col.replace("Sem ", "") for col in sem_cols],
-                    'Average': sem_df.mean().values,
-                    'Highest': sem_df.max().values,
-                    'Lowest': sem_df.min().values,
-                    'Students': sem_df.count().values
-                })
-            
-            # Pre-calculate top and bottom performers
-            top_performers = df_work.nlargest(10, "Current SGPA")[["Student Name", "Registration No.", "Current SGPA"]]
-            bottom_performers = df_work.nsmallest(10, "Current SGPA")[["Student Name", "Registration No.", "Current SGPA"]]
-        else:
-            df_work = analytics_data['df']
-            sem_cols = analytics_data['sem_cols']
-            sem_stats = analytics_data['sem_stats']
-            top_performers = analytics_data['top_performers']
-            bottom_performers = analytics_data['bottom_performers']
+            analytics_data = _compute_analytics(df)
+        
+        df_work = analytics_data['df']
+        sem_cols = analytics_data['sem_cols']
+        sem_matrix = analytics_data['sem_matrix']
+        sem_stats = analytics_data['sem_stats']
+        top_performers = analytics_data['top_performers']
+        bottom_performers = analytics_data['bottom_performers']
+        name_to_pos = analytics_data['name_to_pos']
+    
+    # Derived overview artifacts, reused across tabs and widget reruns
+    # Order-sensitive key: names_lower is matched against df_work by position
+    df_hash = _hash_frame(df_work[["Student Name", "Current SGPA"]])
+    overview = _overview_stats(df_hash, df_work)
     
     # Create tabs for organized analytics
     tab1, tab2, tab3, tab4 = st.tabs(["📈 Overview", "📋 Detailed Results", "🎯 Individual Analysis", "📊 Semester Trends"])
@@ -219,10 +764,10 @@ def show_analytics(df):
         col1, col2, col3, col4 = st.columns(4)
         
         # Pre-calculated metrics for speed
-        total_students = len(df_work)
-        avg_sgpa = df_work["Current SGPA"].mean()
-        max_sgpa = df_work["Current SGPA"].max()
-        min_sgpa = df_work["Current SGPA"].min()
+        total_students = overview['n']
+        avg_sgpa = overview['mean']
+        max_sgpa = overview['max']
+        min_sgpa = overview['min']
         
         col1.metric("Total Students", total_students)
         col2.metric("Average SGPA", f"{avg_sgpa:.2f}" if not pd.isna(avg_sgpa) else "N/A")
@@ -251,7 +796,7 @@ def show_analytics(df):
 
         # === 3. Performance Categories Pie Chart (optimized) ===
         st.subheader("📊 Performance Categories")
-        category_counts = df_work["SGPA Category"].value_counts()
+        category_counts = overview['cat_counts']
         
         fig4 = px.pie(
             values=category_counts.values,
@@ -271,19 +816,22 @@ def show_analytics(df):
         with col2:
             category_filter = st.selectbox(
                 "Filter by Performance Category", 
-                ["All"] + list(df_work["SGPA Category"].unique()),
+                ["All"] + list(overview['cats']),
                 key="analytics_category_filter"
             )
         
-        # Efficient filtering using vectorized operations
-        filtered_df = df_work.copy()
+        # Efficient filtering: combine boolean masks, then index once (no copy)
+        mask = np.ones(len(df_work), dtype=bool)
         
         if search_name:
-            mask = df_work["Student Name"].str.contains(search_name, case=False, na=False)
-            filtered_df = df_work[mask]
+            # Every whitespace-separated token must appear in the name
+            for token in search_name.lower().split():
+                mask &= np.char.find(overview['names_lower'], token) >= 0
             
         if category_filter != "All":
-            filtered_df = filtered_df[filtered_df["SGPA Category"] == category_filter]
+            mask &= (df_work["SGPA Category"] == category_filter).to_numpy()
+        
+        filtered_df = df_work.iloc[np.flatnonzero(mask)]
         
         st.write(f"Showing {len(filtered_df)} of {len(df_work)} students")
         
@@ -311,28 +859,35 @@ def show_analytics(df):
         
         if len(df_work) > 0:
             # Use selectbox with search capability
-            student_names = df_work["Student Name"].tolist()
             selected_student = st.selectbox(
                 "Select a student for detailed analysis:",
-                options=student_names,
+                options=list(name_to_pos),
                 index=0,
                 key="analytics_student_selector"
             )
             
-            # Efficient student data lookup
-            student_data = df_work[df_work["Student Name"] == selected_student].iloc[0]
+            # Efficient student data lookup (O(1) via the name -> row positions map)
+            student_positions = name_to_pos[selected_student]
+            if len(student_positions) > 1:
+                # Several students share this name; disambiguate by registration number
+                student_pos = st.selectbox(
+                    "Multiple students share this name. Select the registration number:",
+                    options=student_positions,
+                    format_func=lambda pos: df_work["Registration No."].iat[pos],
+                    key="analytics_student_reg_selector"
+                )
+            else:
+                student_pos = student_positions[0]
+            student_data = df_work.iloc[student_pos]
             reg_no = student_data['Registration No.']
             student_sgpa = pd.to_numeric(student_data['Current SGPA'], errors='coerce')
             
-            # Calculate rankings
-            df_numeric = df_work.copy()
-            df_numeric["Current SGPA"] = pd.to_numeric(df_numeric["Current SGPA"], errors='coerce')
-            df_numeric = df_numeric.dropna(subset=["Current SGPA"])
-            
-            # Overall class rank by CGPA
-            df_ranked = df_numeric.sort_values("Current SGPA", ascending=False).reset_index(drop=True)
-            df_ranked['Rank'] = df_ranked.index + 1
-            student_rank = df_ranked[df_ranked["Student Name"] == selected_student]["Rank"].iloc[0] if len(df_ranked[df_ranked["Student Name"] == selected_student]) > 0 else "N/A"
+            # Overall class rank by SGPA (already numeric from analytics processing)
+            df_ranked = df_work.dropna(subset=["Current SGPA"]).sort_values(
+                "Current SGPA", ascending=False, kind='stable'
+            )
+            rank_map = dict(zip(df_ranked.index, range(1, len(df_ranked) + 1)))
+            student_rank = rank_map.get(df_work.index[student_pos], "N/A")
             total_ranked_students = len(df_ranked)
             
             # Get topper information
@@ -354,7 +909,7 @@ def show_analytics(df):
                 **Student Details (From Batch Data):**
                 - **Name:** {student_data['Student Name']}
                 - **Registration No.:** {student_data['Registration No.']}
-                - **Father's Name:** {student_data['Father\'s Name']}
+                - **Father's Name:** {student_data["Father's Name"]}
                 - **Current SGPA:** {student_data['Current SGPA']}
                 - **Performance Category:** {student_data['SGPA Category']}
                 """)
@@ -365,7 +920,7 @@ def show_analytics(df):
                 **🏆 Class Ranking Analysis:**
                 - **Class Rank:** {rank_color} {student_rank} out of {total_ranked_students}
                 - **Percentile:** {percentile:.1f}% if percentile else "N/A"
-                - **Above Average:** {"✅ Yes" if student_sgpa and not pd.isna(student_sgpa) and student_sgpa > df_numeric["Current SGPA"].mean() else "❌ No"}
+                - **Above Average:** {"✅ Yes" if student_sgpa and not pd.isna(student_sgpa) and student_sgpa > df_ranked["Current SGPA"].mean() else "❌ No"}
                 """)
                 
                 # Comparison with topper
@@ -381,8 +936,11 @@ def show_analytics(df):
                 
                 # Add button to fetch detailed result
                 if st.button("🔍 Fetch Detailed Result from Website", key="fetch_detailed_result"):
+                    # Already fetched (e.g. pre-warmed by the bulk fetch below)
+                    if f'detailed_result_{reg_no}' in st.session_state:
+                        st.success("✅ Detailed result already available!")
                     # Get base URL from session state (assuming it's stored there)
-                    if 'base_url' in st.session_state:
+                    elif 'base_url' in st.session_state:
                         base_url = st.session_state.base_url
                         
                         with st.spinner(f"Fetching detailed result for {selected_student}..."):
@@ -395,6 +953,27 @@ def show_analytics(df):
                                 st.error("❌ Failed to fetch detailed result. Please check the registration number.")
                     else:
                         st.warning("⚠️ Base URL not found. Please run a fresh scraping operation first.")
+                
+                # Bulk fetch detailed results for the whole batch (needed for subject-wise rankings)
+                if st.button("📥 Fetch Detailed Results for All Students", key="fetch_all_detailed_results"):
+                    if 'base_url' in st.session_state:
+                        pending = [r for r in df_work["Registration No."] if f'detailed_result_{r}' not in st.session_state]
+                        
+                        with st.spinner(f"Fetching detailed results for {len(pending)} students..."):
+                            try:
+                                bulk_results = asyncio.run(fetch_student_results_bulk(st.session_state.base_url, pending)) if pending else {}
+                            except Exception as e:
+                                st.error(f"Failed to fetch detailed results: {str(e)}")
+                                bulk_results = {}
+                        
+                        fetched = 0
+                        for other_reg_no, other_result in bulk_results.items():
+                            if other_result:
+                                st.session_state[f'detailed_result_{other_reg_no}'] = other_result
+                                fetched += 1
+                        st.success(f"✅ Fetched {fetched} of {len(pending)} pending detailed results.")
+                    else:
+                        st.warning("⚠️ Base URL not found. Please run a fresh scraping operation first.")
 
             with col2:
                 # Optimized semester progression chart
@@ -408,7 +987,7 @@ def show_analytics(df):
                                 grade = float(student_data[col])
                                 student_sems.append(col.replace("Sem ", ""))
                                 student_grades.append(grade)
-                            except:
+                            except (ValueError, TypeError):
                                 continue
                     
                     if student_sems:
@@ -453,19 +1032,14 @@ def show_analytics(df):
                             numeric_grades = []
                             semester_names = []
                             
-                            for _, row in sem_df.iterrows():
-                                try:
-                                    grade_text = str(row['Grade/SGPA'])
-                                    # Extract numeric value (handle formats like "8.5", "8.5 (A)", etc.)
-                                    import re
-                                    numeric_match = re.search(r'(\d+\.?\d*)', grade_text)
-                                    if numeric_match:
-                                        grade = float(numeric_match.group(1))
-                                        if 0 <= grade <= 10:  # Valid SGPA range
-                                            numeric_grades.append(grade)
-                                            semester_names.append(row['Semester'])
-                                except:
-                                    continue
+                            for grade_text, semester_name in zip(sem_df['Grade/SGPA'].to_numpy(), sem_df['Semester'].to_numpy()):
+                                # Extract numeric value (handle formats like "8.5", "8.5 (A)", etc.)
+                                numeric_match = _GRADE_RE.search(str(grade_text))
+                                if numeric_match:
+                                    grade = float(numeric_match.group(1))
+                                    if 0 <= grade <= 10:  # Valid SGPA range
+                                        numeric_grades.append(grade)
+                                        semester_names.append(semester_name)
                             
                             if numeric_grades:
                                 fig_detailed = px.line(
@@ -486,7 +1060,7 @@ def show_analytics(df):
                 with detail_tab3:
                     if detailed_result['subject_results']:
                         st.markdown("### 📚 Subject-wise Performance & Rankings")
-                        subject_df = pd.DataFrame(detailed_result['subject_results'])
+                        subject_df = _subject_df(reg_no, _payload_hash(detailed_result), detailed_result['subject_results'])
                         
                         # Display the subject results table
                         st.dataframe(subject_df, width='stretch', hide_index=True)
@@ -502,82 +1076,59 @@ def show_analytics(df):
                             if sem_cols:
                                 st.info("📊 **Semester-wise ranking** based on semester SGPA from batch data.")
                                 
+                                # Rank the student in every semester at once: one pass over the matrix
+                                student_grades_all = sem_matrix[student_pos]
+                                taken = np.flatnonzero(~np.isnan(student_grades_all))
+                                sub = sem_matrix[:, taken]
+                                sub_grades = student_grades_all[taken]
+                                sem_ranks = np.count_nonzero(sub > sub_grades, axis=0) + 1
+                                sem_totals = np.count_nonzero(~np.isnan(sub), axis=0)
+                                sem_toppers = np.nanmax(sub, axis=0)
+                                
                                 # Create ranking comparison for available semesters
                                 ranking_data = []
-                                for sem_col in sem_cols:
-                                    sem_name = sem_col.replace("Sem ", "Semester ")
-                                    sem_data = df_work[[sem_col, "Student Name"]].copy()
-                                    sem_data[sem_col] = pd.to_numeric(sem_data[sem_col], errors='coerce')
-                                    sem_data = sem_data.dropna(subset=[sem_col])
-                                    
-                                    if len(sem_data) > 0:
-                                        # Rank students for this semester
-                                        sem_data_ranked = sem_data.sort_values(sem_col, ascending=False).reset_index(drop=True)
-                                        sem_data_ranked['Rank'] = sem_data_ranked.index + 1
-                                        
-                                        # Find current student's rank
-                                        student_sem_data = sem_data_ranked[sem_data_ranked["Student Name"] == selected_student]
-                                        if len(student_sem_data) > 0:
-                                            student_sem_rank = student_sem_data["Rank"].iloc[0]
-                                            student_sem_grade = student_sem_data[sem_col].iloc[0]
-                                            
-                                            # Get topper for this semester
-                                            sem_topper = sem_data_ranked.iloc[0]
-                                            topper_sem_grade = sem_topper[sem_col]
-                                            
-                                            ranking_data.append({
-                                                "Semester": sem_name,
-                                                "Your Grade": f"{student_sem_grade:.2f}",
-                                                "Your Rank": f"{student_sem_rank}/{len(sem_data_ranked)}",
-                                                "Topper Grade": f"{topper_sem_grade:.2f}",
-                                                "Gap from Topper": f"{topper_sem_grade - student_sem_grade:.2f}",
-                                                "Percentile": f"{((len(sem_data_ranked) - student_sem_rank + 1) / len(sem_data_ranked)) * 100:.1f}%"
-                                            })
+                                for j, student_sem_grade, student_sem_rank, total_sem_students, topper_sem_grade in zip(
+                                    taken, sub_grades, sem_ranks, sem_totals, sem_toppers
+                                ):
+                                    ranking_data.append({
+                                        "Semester": sem_cols[j].replace("Sem ", "Semester "),
+                                        "Your Grade": f"{student_sem_grade:.2f}",
+                                        "Your Rank": f"{student_sem_rank}/{total_sem_students}",
+                                        "Topper Grade": f"{topper_sem_grade:.2f}",
+                                        "Gap from Topper": f"{topper_sem_grade - student_sem_grade:.2f}",
+                                        "Percentile": f"{((total_sem_students - student_sem_rank + 1) / total_sem_students) * 100:.1f}%"
+                                    })
                                 
                                 if ranking_data:
                                     ranking_df = pd.DataFrame(ranking_data)
                                     st.dataframe(ranking_df, width='stretch', hide_index=True)
                                     
                                     # Create visualization for semester-wise performance comparison
-                                    fig_comparison = go.Figure()
-                                    
-                                    # Add student's grades
                                     student_grades = [float(row["Your Grade"]) for row in ranking_data]
                                     topper_grades = [float(row["Topper Grade"]) for row in ranking_data]
                                     semesters = [row["Semester"] for row in ranking_data]
                                     
-                                    fig_comparison.add_trace(go.Scatter(
-                                        x=semesters,
-                                        y=student_grades,
-                                        mode='lines+markers',
-                                        name=f'{selected_student}',
-                                        line=dict(color='blue', width=3),
-                                        marker=dict(size=8)
-                                    ))
-                                    
-                                    fig_comparison.add_trace(go.Scatter(
-                                        x=semesters,
-                                        y=topper_grades,
-                                        mode='lines+markers',
-                                        name='Class Topper',
-                                        line=dict(color='gold', width=3),
-                                        marker=dict(size=8)
-                                    ))
-                                    
-                                    # Add class average
-                                    avg_grades = []
-                                    for sem_col in sem_cols[:len(ranking_data)]:
-                                        sem_avg = pd.to_numeric(df_work[sem_col], errors='coerce').mean()
-                                        avg_grades.append(sem_avg)
+                                    # Class average (reuse the pre-calculated semester statistics)
+                                    avg_grades = sem_stats.set_index('Semester').loc[
+                                        [sem.replace("Semester ", "") for sem in semesters], 'Average'
+                                    ].tolist()
                                     
-                                    fig_comparison.add_trace(go.Scatter(
-                                        x=semesters,
-                                        y=avg_grades,
-                                        mode='lines+markers',
-                                        name='Class Average',
-                                        line=dict(color='red', width=2, dash='dash'),
-                                        marker=dict(size=6)
-                                    ))
+                                    # One long-format frame, one px.line call for all three series
+                                    k = len(semesters)
+                                    df_long = pd.DataFrame({
+                                        'Semester': semesters * 3,
+                                        'SGPA': student_grades + topper_grades + avg_grades,
+                                        'Series': [selected_student] * k + ['Class Topper'] * k + ['Class Average'] * k
+                                    })
+                                    fig_comparison = px.line(
+                                        df_long, x='Semester', y='SGPA', color='Series', markers=True,
+                                        color_discrete_map={selected_student: 'blue', 'Class Topper': 'gold', 'Class Average': 'red'}
+                                    )
+                                    fig_comparison.update_traces(line=dict(width=3), marker=dict(size=8))
+                                    fig_comparison.update_traces(
+                                        selector={'name': 'Class Average'},
+                                        line=dict(width=2, dash='dash'), marker=dict(size=6)
+                                    )
                                     
                                     fig_comparison.update_layout(
                                         title="Semester-wise Performance Comparison",
@@ -594,248 +1145,41 @@ def show_analytics(df):
                                 st.warning("📝 No semester data available for ranking calculation.")
                         
                         with rank_tab2:
-                            # True subject-wise ranking from detailed results
-                            st.info("📚 **Individual subject rankings** based on detailed scraped results. Click 'Fetch Detailed Result' first to see subject-wise rankings.")
-                            
-                            # Check if we have detailed results for other students to compare with
-                            all_detailed_results = {}
-                            for other_student in df_work["Student Name"]:
-                                other_reg_no = df_work[df_work["Student Name"] == other_student]["Registration No."].iloc[0]
-                                other_detailed_key = f'detailed_result_{other_reg_no}'
-                                if other_detailed_key in st.session_state:
-                                    all_detailed_results[other_student] = st.session_state[other_detailed_key]
-                            
-                            if len(all_detailed_results) > 1:
-                                st.success(f"📊 Found detailed results for {len(all_detailed_results)} students. Calculating subject-wise rankings...")
-                                
-                                # Extract subject-wise data for all students
-                                subject_ranking_data = {}
-                                
-                                for student_name, detailed_data in all_detailed_results.items():
-                                    if detailed_data and 'subject_results' in detailed_data and detailed_data['subject_results']:
-                                        subject_df = pd.DataFrame(detailed_data['subject_results'])
-                                        
-                                        # Find grade columns
-                                        grade_columns = [col for col in subject_df.columns if any(keyword in col.lower() for keyword in ['grade', 'point', 'gp', 'marks'])]
-                                        
-                                        if grade_columns:
-                                            grade_col = grade_columns[0]  # Use first grade column
-                                            subject_col = subject_df.columns[0]  # Assume first column is subject name
-                                            
-                                            for _, row in subject_df.iterrows():
-                                                subject_name = row[subject_col]
-                                                try:
-                                                    grade = float(row[grade_col])
-                                                    if subject_name not in subject_ranking_data:
-                                                        subject_ranking_data[subject_name] = []
-                                                    subject_ranking_data[subject_name].append({
-                                                        'Student': student_name,
-                                                        'Grade': grade
-                                                    })
-                                                except:
-                                                    continue
-                                
-                                if subject_ranking_data:
-                                    # Calculate rankings for each subject
-                                    subject_rankings = {}
-                                    current_student_rankings = []
-                                    
-                                    for subject, students_grades in subject_ranking_data.items():
-                                        if len(students_grades) > 1:  # Only rank if multiple students
-                                            # Sort by grade descending
-                                            sorted_students = sorted(students_grades, key=lambda x: x['Grade'], reverse=True)
-                                            
-                                            # Assign ranks
-                                            for i, student_data in enumerate(sorted_students):
-                                                rank = i + 1
-                                                if student_data['Student'] == selected_student:
-                                                    current_student_rankings.append({
-                                                        'Subject': subject,
-                                                        'Your Grade': student_data['Grade'],
-                                                        'Your Rank': f"{rank}/{len(sorted_students)}",
-                                                        'Topper Grade': sorted_students[0]['Grade'],
-                                                        'Topper': sorted_students[0]['Student'],
-                                                        'Gap': f"{sorted_students[0]['Grade'] - student_data['Grade']:.2f}",
-                                                        'Percentile': f"{((len(sorted_students) - rank + 1) / len(sorted_students)) * 100:.1f}%"
-                                                    })
-                                            
-                                            subject_rankings[subject] = sorted_students
-                                    
-                                    if current_student_rankings:
-                                        st.markdown("##### 🏆 Your Subject-wise Rankings")
-                                        ranking_df = pd.DataFrame(current_student_rankings)
-                                        st.dataframe(ranking_df, width='stretch', hide_index=True)
-                                        
-                                        # Subject-wise performance visualization
-                                        if len(current_student_rankings) > 0:
-                                            subjects = [row['Subject'] for row in current_student_rankings]
-                                            your_grades = [row['Your Grade'] for row in current_student_rankings]
-                                            topper_grades = [row['Topper Grade'] for row in current_student_rankings]
-                                            ranks = [int(row['Your Rank'].split('/')[0]) for row in current_student_rankings]
-                                            
-                                            # Create comparison chart
-                                            fig_subject_comparison = go.Figure()
-                                            
-                                            fig_subject_comparison.add_trace(go.Bar(
-                                                name='Your Grade',
-                                                x=subjects,
-                                                y=your_grades,
-                                                marker_color='lightblue',
-                                                text=[f'{g:.1f}' for g in your_grades],
-                                                textposition='auto',
-                                            ))
-                                            
-                                            fig_subject_comparison.add_trace(go.Bar(
-                                                name='Topper Grade',
-                                                x=subjects,
-                                                y=topper_grades,
-                                                marker_color='gold',
-                                                text=[f'{g:.1f}' for g in topper_grades],
-                                                textposition='auto',
-                                            ))
-                                            
-                                            fig_subject_comparison.update_layout(
-                                                title='Subject-wise Grade Comparison (You vs Topper)',
-                                                xaxis_title='Subjects',
-                                                yaxis_title='Grades',
-                                                barmode='group',
-                                                xaxis_tickangle=-45
-                                            )
-                                            
-                                            st.plotly_chart(fig_subject_comparison, width='stretch')
-                                            
-                                            # Ranking visualization
-                                            fig_ranks = go.Figure(data=go.Scatter(
-                                                x=subjects,
-                                                y=ranks,
-                                                mode='markers+lines',
-                                                marker=dict(
-                                                    size=[20 if r == 1 else 15 if r <= 3 else 10 for r in ranks],
-                                                    color=['gold' if r == 1 else 'silver' if r == 2 else 'bronze' if r == 3 else 'lightcoral' for r in ranks],
-                                                    line=dict(width=2, color='darkblue')
-                                                ),
-                                                text=[f'Rank {r}' for r in ranks],
-                                                textposition='top center'
-                                            ))
-                                            
-                                            fig_ranks.update_layout(
-                                                title='Your Subject-wise Rankings',
-                                                xaxis_title='Subjects',
-                                                yaxis_title='Rank Position',
-                                                yaxis=dict(autorange='reversed'),  # Lower rank number = better position
-                                                xaxis_tickangle=-45
-                                            )
-                                            
-                                            st.plotly_chart(fig_ranks, width='stretch')
-                                            
-                                            # Performance summary
-                                            st.markdown("##### 📊 Subject-wise Performance Summary")
-                                            
-                                            rank_1 = sum(1 for r in ranks if r == 1)
-                                            rank_top3 = sum(1 for r in ranks if r <= 3)
-                                            rank_top50 = sum(1 for r in ranks if r <= len(ranks) * 0.5)
-                                            
-                                            col1, col2, col3, col4 = st.columns(4)
-                                            col1.metric("🥇 First Position", rank_1)
-                                            col2.metric("🏆 Top 3 Positions", rank_top3)
-                                            col3.metric("📊 Top 50%", rank_top50)
-                                            col4.metric("📈 Total Subjects", len(ranks))
-                                            
-                                            # Best and worst subjects
-                                            best_subject_idx = ranks.index(min(ranks))
-                                            worst_subject_idx = ranks.index(max(ranks))
-                                            
-                                            col1, col2 = st.columns(2)
-                                            with col1:
-                                                st.success(f"""
-                                                **🏅 Best Subject:**
-                                                - **Subject:** {subjects[best_subject_idx]}
-                                                - **Rank:** {ranks[best_subject_idx]}
-                                                - **Grade:** {your_grades[best_subject_idx]:.2f}
-                                                """)
-                                            
-                                            with col2:
-                                                st.warning(f"""
-                                                **📈 Improvement Area:**
-                                                - **Subject:** {subjects[worst_subject_idx]}
-                                                - **Rank:** {ranks[worst_subject_idx]}
-                                                - **Grade:** {your_grades[worst_subject_idx]:.2f}
-                                                - **Gap to Topper:** {topper_grades[worst_subject_idx] - your_grades[worst_subject_idx]:.2f} points
-                                                """)
-                                    else:
-                                        st.warning("📝 No subject ranking data found for the selected student.")
-                                else:
-                                    st.warning("📝 No comparable subject data found across students.")
-                            else:
-                                st.warning(f"""
-                                📝 **Subject-wise ranking requires detailed results for multiple students.**
-                                
-                                Currently have detailed results for: {len(all_detailed_results)} student(s)
-                                
-                                To see subject-wise rankings:
-                                1. Select different students and click 'Fetch Detailed Result' for each
-                                2. Return to this student to see comparative subject rankings
-                                3. Minimum 2 students with detailed results needed for ranking
-                                """)
+                            _render_subject_rank_tab(selected_student, df_work, name_to_pos)
                         
                         # If there are specific subject grades, create detailed analysis
-                        st.markdown("#### 📋 Individual Subject Analysis")
-                        grade_columns = [col for col in subject_df.columns if any(keyword in col.lower() for keyword in ['grade', 'point', 'gp', 'marks'])]
+                        grade_columns = _grade_columns(tuple(subject_df.columns))
                         if grade_columns:
                             st.markdown("#### 📋 Individual Subject Analysis")
+                            subject_col = subject_df.columns[0]  # Subject names are usually the first column
                             for grade_col in grade_columns[:2]:  # Show up to 2 grade columns
                                 try:
-                                    # Try to create a bar chart for grades
+                                    # Convert once; the same mask feeds the chart and the summary
                                     numeric_grades = pd.to_numeric(subject_df[grade_col], errors='coerce')
-                                    if not numeric_grades.isna().all():
-                                        valid_data = subject_df[numeric_grades.notna()]
+                                    mask = numeric_grades.notna().to_numpy()
+                                    if mask.any():
+                                        valid_grades = numeric_grades.to_numpy()[mask]
+                                        valid_subjects = subject_df[subject_col].to_numpy()[mask]
+                                        
+                                        # Create enhanced bar chart with color coding
+                                        st.plotly_chart(
+                                            _build_grade_distribution_fig(tuple(valid_subjects), valid_grades, grade_col),
+                                            width='stretch'
+                                        )
+                                        
+                                        # Subject performance summary in one pass: bucket 0 is <7, 1 is 7-8, 2 is 8-9, 3 is 9+
+                                        poor, average, good, excellent = np.bincount(
+                                            np.digitize(valid_grades, [7, 8, 9]), minlength=4
+                                        ).tolist()
                                         
-                                        if len(valid_data) > 0:
-                                            # Get subject names (usually first column)
-                                            subject_col = subject_df.columns[0]
-                                            
-                                            # Create enhanced bar chart with color coding
-                                            grades = numeric_grades[numeric_grades.notna()]
-                                            subjects = valid_data[subject_col]
-                                            
-                                            # Color code based on performance
-                                            colors = ['gold' if g >= 9 else 'lightgreen' if g >= 8 else 'orange' if g >= 7 else 'lightcoral' for g in grades]
-                                            
-                                            fig_subjects = go.Figure(data=[
-                                                go.Bar(
-                                                    x=subjects,
-                                                    y=grades,
-                                                    marker_color=colors,
-                                                    text=[f'{g:.1f}' for g in grades],
-                                                    textposition='auto',
-                                                )
-                                            ])
-                                            
-                                            fig_subjects.update_layout(
-                                                title=f"Subject-wise {grade_col} Distribution",
-                                                xaxis_title="Subjects",
-                                                yaxis_title=grade_col,
-                                                xaxis_tickangle=-45,
-                                                showlegend=False
-                                            )
-                                            
-                                            st.plotly_chart(fig_subjects, width='stretch')
-                                            
-                                            # Subject performance summary
-                                            if len(grades) > 0:
-                                                excellent = sum(1 for g in grades if g >= 9)
-                                                good = sum(1 for g in grades if 8 <= g < 9)
-                                                average = sum(1 for g in grades if 7 <= g < 8)
-                                                poor = sum(1 for g in grades if g < 7)
-                                                
-                                                col1, col2, col3, col4 = st.columns(4)
-                                                col1.metric("🥇 Excellent (9+)", excellent)
-                                                col2.metric("🥈 Good (8-9)", good)
-                                                col3.metric("🥉 Average (7-8)", average)
-                                                col4.metric("📉 Below Average (<7)", poor)
-                                            
-                                            break
-                                except:
+                                        col1, col2, col3, col4 = st.columns(4)
+                                        col1.metric("🥇 Excellent (9+)", excellent)
+                                        col2.metric("🥈 Good (8-9)", good)
+                                        col3.metric("🥉 Average (7-8)", average)
+                                        col4.metric("📉 Below Average (<7)", poor)
+                                        
+                                        break
+                                except (ValueError, TypeError):
                                     continue
                     else:
                         st.info("📝 No subject-wise data available in the detailed result.")
@@ -845,11 +1189,9 @@ def show_analytics(df):
                 col1, col2 = st.columns(2)
                 with col1:
                     if st.button("💾 Export Detailed Result as JSON", key="export_detailed_json"):
-                        import json
-                        json_str = json.dumps(detailed_result, indent=2, ensure_ascii=False)
                         st.download_button(
                             label="📥 Download JSON",
-                            data=json_str,
+                            data=_dump_detailed(reg_no, detailed_result),
                             file_name=f"detailed_result_{reg_no}.json",
                             mime="application/json"
                         )
@@ -865,35 +1207,9 @@ def show_analytics(df):
         st.subheader("📉 Semester-wise Analysis")
         
         if sem_stats is not None:
-            # Use pre-calculated semester statistics
-            fig_trend = go.Figure()
-            fig_trend.add_trace(go.Scatter(
-                x=sem_stats['Semester'], 
-                y=sem_stats['Average'],
-                mode='lines+markers',
-                name='Average',
-                line=dict(color='blue', width=3)
-            ))
-            fig_trend.add_trace(go.Scatter(
-                x=sem_stats['Semester'], 
-                y=sem_stats['Highest'],
-                mode='lines+markers',
-                name='Highest',
-                line=dict(color='green', width=2)
-            ))
-            fig_trend.add_trace(go.Scatter(
-                x=sem_stats['Semester'], 
-                y=sem_stats['Lowest'],
-                mode='lines+markers',
-                name='Lowest',
-                line=dict(color='red', width=2)
-            ))
-            
-            fig_trend.update_layout(
-                title="Semester-wise Grade Trends",
-                xaxis_title="Semester",
-                yaxis_title="Grade",
-                yaxis=dict(range=[0, 10])
+            # Use pre-calculated semester statistics; the figure is cached on their content
+            fig_trend = _build_trend_fig(
+                tuple(sem_stats.columns), tuple(sem_stats.itertuples(index=False, name=None))
             )
             st.plotly_chart(fig_trend, width='stretch')
             
@@ -938,4 +1254,7 @@ def show_analytics(df):
     
     # Performance indicator
     processing_time = time.time() - start_time
-    st.caption(f"⚡ Analytics processed in {processing_time:.2f} seconds")
\ No newline at end of file
+    if analytics_data['computed_at'] >= start_time:
+        st.caption(f"⚡ Analytics computed in {processing_time:.2f} seconds")
+    else:
+        st.caption(f"⚡ Served from cache in {processing_time * 1000:.1f} ms")
\ No newline at end of file
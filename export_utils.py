@@ -78,5 +78,10 @@ def export_to_pdf(df, output_file):
 
     html = HTML_TEMPLATE.format(header_cells=header_cells, row_cells=row_cells)
 
+    # Accept an in-memory buffer (e.g. io.BytesIO) as well as a file path
+    if hasattr(output_file, "write"):
+        pisa.CreatePDF(html, dest=output_file)
+        return
+
     with open(output_file, "w+b") as result_file:
         pisa.CreatePDF(html, dest=result_file)
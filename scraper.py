@@ -1,45 +1,145 @@
 import asyncio
+import atexit
+import threading
 import aiohttp
-from bs4 import BeautifulSoup
-import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from lxml import etree, html as lxml_html
+from concurrent.futures import ThreadPoolExecutor, wait
 import pandas as pd
 import streamlit as st
 from typing import List, Dict, Optional
-import functools
+from collections import deque
+import hashlib
+import math
 import logging
-import requests
+import os
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Requests in flight at once against the results server; halved automatically on sustained 503s
+MAX_CONCURRENT = 48
+
+# aiohttp already negotiates compression (gzip/deflate, plus br when Brotli is installed)
+_SESSION_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+}
+
 # Session configuration - will be created when needed
 def get_session_config():
     """Create session configuration when needed"""
     return {
+        'headers': _SESSION_HEADERS,
         'timeout': aiohttp.ClientTimeout(total=10, connect=5),
         'connector': aiohttp.TCPConnector(
             limit=100,  # Total connection pool size
-            limit_per_host=20,  # Connections per host
+            limit_per_host=MAX_CONCURRENT,  # Connections per host
             ttl_dns_cache=300,  # DNS cache TTL
             use_dns_cache=True,
+            keepalive_timeout=60,  # Keep idle connections warm between fetches
         )
     }
 
-class FastResultScraper:
-    def __init__(self):
-        self.session = None
-        self.successful_fetches = 0
-        self.failed_fetches = 0
-        
+# One long-lived event loop on a daemon thread owns the shared session, so
+# keep-alive connections, TLS sessions and the DNS cache survive across fetches
+_LOOP: Optional[asyncio.AbstractEventLoop] = None
+_LOOP_LOCK = threading.Lock()
+_SHARED_SESSION: Optional[aiohttp.ClientSession] = None
+_SESSION_LOCK: Optional[asyncio.Lock] = None
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    """Start the scraper's background event loop on first use"""
+    global _LOOP
+    with _LOOP_LOCK:
+        if _LOOP is None:
+            _LOOP = asyncio.new_event_loop()
+            threading.Thread(target=_LOOP.run_forever, name="scraper-loop", daemon=True).start()
+    return _LOOP
+
+async def _get_session() -> aiohttp.ClientSession:
+    """Shared client session, created lazily on the scraper loop"""
+    global _SHARED_SESSION, _SESSION_LOCK
+    if _SESSION_LOCK is None:
+        _SESSION_LOCK = asyncio.Lock()
+    async with _SESSION_LOCK:
+        if _SHARED_SESSION is None or _SHARED_SESSION.closed:
+            _SHARED_SESSION = aiohttp.ClientSession(**get_session_config())
+    return _SHARED_SESSION
+
+@atexit.register
+def _close_shared_session():
+    if _LOOP is not None and _SHARED_SESSION is not None and not _SHARED_SESSION.closed:
+        asyncio.run_coroutine_threadsafe(_SHARED_SESSION.close(), _LOOP).result(timeout=5)
+
+# Selectors compiled once at import, not once per page
+_XP_FIELDS = {
+    "Registration No.": etree.XPath("//*[@id='ContentPlaceHolder1_DataList1_RegistrationNoLabel_0']"),
+    "Student Name": etree.XPath("//*[@id='ContentPlaceHolder1_DataList1_StudentNameLabel_0']"),
+    "Father's Name": etree.XPath("//*[@id='ContentPlaceHolder1_DataList1_FatherNameLabel_0']"),
+    "Mother's Name": etree.XPath("//*[@id='ContentPlaceHolder1_DataList1_MotherNameLabel_0']"),
+    "Current SGPA": etree.XPath("//*[@id='ContentPlaceHolder1_DataList5_GROSSTHEORYTOTALLabel_0']"),
+}
+# Semester grid: header cells of the first row, value cells of the second, selected in one step each
+_XP_GRID_HEADERS = etree.XPath("(//*[@id='ContentPlaceHolder1_GridView3']//tr)[1]/th")
+_XP_GRID_VALUES = etree.XPath("(//*[@id='ContentPlaceHolder1_GridView3']//tr)[2]/td")
+
+# Present in every page that carries a result; "no record" stubs are rejected on this before parsing
+_RESULT_MARKER = b"_DataList1_RegistrationNoLabel_0"
+
+# Parsed pages keyed by (blake2b digest of the HTML, registration no.); oldest entries evicted first
+_PARSE_CACHE: Dict[tuple, Optional[Dict]] = {}
+_PARSE_CACHE_SIZE = 4096
+
+# lxml releases the GIL while parsing, so pages parse in parallel with each other and with network I/O
+_PARSE_POOL = ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 1), thread_name_prefix="scraper-parse")
+
+def _to_float(value: str) -> float:
+    """Grade text as a float, NaN when the page shows something non-numeric"""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+class _NoResults(Exception):
+    """Raised inside the cached fetch so an empty scrape is not memoized"""
+
+class _AdaptiveLimiter:
+    """Concurrency cap that halves itself when the server starts shedding load with 503s"""
+    
+    def __init__(self, limit: int, minimum: int = 4, window: int = 50, threshold: float = 0.1):
+        self.limit = limit
+        self.minimum = minimum
+        self.threshold = threshold
+        self._recent = deque(maxlen=window)
+        self._in_flight = 0
+        self._cond = asyncio.Condition()
+    
     async def __aenter__(self):
-        self.session = aiohttp.ClientSession(**get_session_config())
+        async with self._cond:
+            await self._cond.wait_for(lambda: self._in_flight < self.limit)
+            self._in_flight += 1
         return self
-        
+    
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        if self.session:
-            await self.session.close()
+        async with self._cond:
+            self._in_flight -= 1
+            self._cond.notify()
+    
+    def record(self, status: int):
+        """Track the rolling 503 rate and back off when it exceeds the threshold"""
+        self._recent.append(status == 503)
+        window = self._recent.maxlen
+        if len(self._recent) == window and sum(self._recent) > self.threshold * window and self.limit > self.minimum:
+            self.limit = max(self.minimum, self.limit // 2)
+            self._recent.clear()
+            logger.info(f"Server returning 503s, reducing concurrency to {self.limit}")
+
+class FastResultScraper:
+    def __init__(self, session: aiohttp.ClientSession, limiter: Optional[_AdaptiveLimiter] = None):
+        self.session = session
+        self.limiter = limiter
+        self.successful_fetches = 0
+        self.failed_fetches = 0
 
     async def fetch_single_result(self, base_url: str, registration_no: int, retries: int = 2) -> Optional[Dict]:
         """Async function to fetch a single student result with optimized parsing"""
@@ -48,9 +148,14 @@ class FastResultScraper:
         for attempt in range(retries):
             try:
                 async with self.session.get(url) as response:
+                    if self.limiter:
+                        self.limiter.record(response.status)
                     if response.status == 200:
-                        html = await response.text()
-                        result = self._parse_html_optimized(html, registration_no)
+                        raw = await response.read()
+                        if _RESULT_MARKER not in raw:
+                            # No record for this number: a definite answer, not worth a retry
+                            break
+                        result = await self._parse_html_cached(raw, registration_no, response.charset or "utf-8")
                         if result:
                             self.successful_fetches += 1
                             return result
@@ -67,35 +172,46 @@ class FastResultScraper:
         self.failed_fetches += 1
         return None
 
+    async def _parse_html_cached(self, raw: bytes, reg_no: int, encoding: str = "utf-8") -> Optional[Dict]:
+        """Parse a result page, reusing the result for byte-identical pages"""
+        key = (hashlib.blake2b(raw, digest_size=16).digest(), reg_no)
+        if key in _PARSE_CACHE:
+            result = _PARSE_CACHE[key]
+        else:
+            # Parse off the event loop so socket reads keep being scheduled meanwhile;
+            # the cache itself is only touched here, on the loop thread
+            result = await asyncio.get_running_loop().run_in_executor(
+                _PARSE_POOL, lambda: self._parse_html_optimized(raw.decode(encoding, "replace"), reg_no)
+            )
+            if len(_PARSE_CACHE) >= _PARSE_CACHE_SIZE:
+                _PARSE_CACHE.pop(next(iter(_PARSE_CACHE)))
+            _PARSE_CACHE[key] = result
+        return dict(result) if result else result
+
     def _parse_html_optimized(self, html: str, reg_no: int) -> Optional[Dict]:
         """Optimized HTML parsing with better error handling"""
         try:
-            soup = BeautifulSoup(html, "lxml")  # lxml is faster than html.parser
+            doc = lxml_html.fromstring(html)  # lxml directly, no BeautifulSoup wrapper objects
             
             # Quick check if page has data
-            if not soup.select_one("#ContentPlaceHolder1_DataList1_RegistrationNoLabel_0"):
+            if not _XP_FIELDS["Registration No."](doc):
                 return None
                 
             # Extract basic info with fallbacks
             result = {
-                "Registration No.": self._safe_extract(soup, "#ContentPlaceHolder1_DataList1_RegistrationNoLabel_0", str(reg_no)),
-                "Student Name": self._safe_extract(soup, "#ContentPlaceHolder1_DataList1_StudentNameLabel_0", "N/A"),
-                "Father's Name": self._safe_extract(soup, "#ContentPlaceHolder1_DataList1_FatherNameLabel_0", "N/A"),
-                "Mother's Name": self._safe_extract(soup, "#ContentPlaceHolder1_DataList1_MotherNameLabel_0", "N/A"),
-                "Current SGPA": self._safe_extract(soup, "#ContentPlaceHolder1_DataList5_GROSSTHEORYTOTALLabel_0", "0.0")
+                "Registration No.": self._safe_extract(doc, _XP_FIELDS["Registration No."], str(reg_no)),
+                "Student Name": self._safe_extract(doc, _XP_FIELDS["Student Name"], "N/A"),
+                "Father's Name": self._safe_extract(doc, _XP_FIELDS["Father's Name"], "N/A"),
+                "Mother's Name": self._safe_extract(doc, _XP_FIELDS["Mother's Name"], "N/A"),
+                "Current SGPA": _to_float(self._safe_extract(doc, _XP_FIELDS["Current SGPA"], "0.0"))
             }
             
             # Extract semester data if available
-            table = soup.select_one("#ContentPlaceHolder1_GridView3")
-            if table and table.select("tr"):
-                rows = table.select("tr")
-                if len(rows) >= 2:
-                    headers = [th.get_text(strip=True) for th in rows[0].find_all("th")]
-                    values = [td.get_text(strip=True) for td in rows[1].find_all("td")]
-                    
-                    for header, value in zip(headers, values):
-                        if header and value:  # Only add non-empty data
-                            result[f"Sem {header}"] = value
+            headers = [th.text_content().strip() for th in _XP_GRID_HEADERS(doc)]
+            values = [td.text_content().strip() for td in _XP_GRID_VALUES(doc)]
+            for header, value in zip(headers, values):
+                if header and value:  # Only add non-empty data
+                    result[f"Sem {header}"] = _to_float(value) if header == "Cur. CGPA" else value
             
             return result
             
@@ -103,63 +219,115 @@ class FastResultScraper:
             logger.debug(f"Parsing failed for {reg_no}: {e}")
             return None
 
-    def _safe_extract(self, soup, selector: str, default: str = "N/A") -> str:
-        """Safely extract text from soup with fallback"""
-        try:
-            element = soup.select_one(selector)
-            return element.get_text(strip=True) if element else default
-        except:
-            return default
+    def _safe_extract(self, doc, selector, default: str = "N/A") -> str:
+        """Safely extract the first match's text with a precompiled selector"""
+        elements = selector(doc)
+        return elements[0].text_content().strip() if elements else default
 
 async def fetch_all_results_async(base_url: str, start_reg: int, end_reg: int, 
                                  progress_callback=None) -> List[Dict]:
     """Async function to fetch all results with progress tracking"""
+    results, = await fetch_all_ranges_async(base_url, [(start_reg, end_reg)], progress_callback)
+    return results
+
+async def fetch_all_ranges_async(base_url: str, ranges: List[tuple], progress_callback=None) -> List[List[Dict]]:
+    """Scrape several registration ranges as one batch; returns each range's results separately"""
     
-    async with FastResultScraper() as scraper:
-        # Create semaphore to limit concurrent requests (respect server limits)
-        semaphore = asyncio.Semaphore(15)  # Increased from 5 for better performance
-        
-        async def fetch_with_semaphore(reg_no):
-            async with semaphore:
-                return await scraper.fetch_single_result(base_url, reg_no)
-        
-        # Create all tasks
-        reg_numbers = list(range(start_reg, end_reg + 1))
-        total_requests = len(reg_numbers)
-        
-        # Show initial progress
-        if progress_callback:
-            progress_callback(0, total_requests, 0, 0)
-        
-        # Execute tasks with progress tracking
-        tasks = [fetch_with_semaphore(reg_no) for reg_no in reg_numbers]
-        results = []
-        completed = 0
-        
-        # Process results as they complete
-        for future in asyncio.as_completed(tasks):
-            result = await future
-            completed += 1
-            
-            if result:
-                results.append(result)
-            
-            # Update progress every 5 completions or at the end
-            if progress_callback and (completed % 5 == 0 or completed == total_requests):
-                progress_callback(completed, total_requests, scraper.successful_fetches, scraper.failed_fetches)
+    # Limit concurrent requests, backing off if the server starts refusing them
+    limiter = _AdaptiveLimiter(MAX_CONCURRENT)
+    scraper = FastResultScraper(await _get_session(), limiter)
+    
+    # One flat batch, so a single limiter and progress count span every range
+    spans = [range(start_reg, end_reg + 1) for start_reg, end_reg in ranges]
+    reg_numbers = [reg_no for span in spans for reg_no in span]
+    total_requests = len(reg_numbers)
+    completed = 0
+    
+    async def fetch_with_semaphore(reg_no):
+        nonlocal completed
+        async with limiter:
+            result = await scraper.fetch_single_result(base_url, reg_no)
+        # Every task runs on the same loop, so a plain counter is safe here
+        completed += 1
         
-        logger.info(f"Scraping complete: {scraper.successful_fetches} successful, {scraper.failed_fetches} failed")
-        return results
+        # Update progress every 5 completions or at the end
+        if progress_callback and (completed % 5 == 0 or completed == total_requests):
+            progress_callback(completed, total_requests, scraper.successful_fetches, scraper.failed_fetches)
+        return result
+    
+    # Show initial progress
+    if progress_callback:
+        progress_callback(0, total_requests, 0, 0)
+    
+    # gather() returns results in registration order, no per-completion queue needed
+    fetched = await asyncio.gather(*(fetch_with_semaphore(reg_no) for reg_no in reg_numbers))
+    
+    # Split the flat results back into their ranges
+    per_range = []
+    offset = 0
+    for span in spans:
+        per_range.append([result for result in fetched[offset:offset + len(span)] if result])
+        offset += len(span)
+    
+    logger.info(f"Scraping complete: {scraper.successful_fetches} successful, {scraper.failed_fetches} failed")
+    return per_range
+
+async def _race_probes(url_primary: str, url_secondary: str, start_reg: int, end_reg: int) -> str:
+    """Probe both URL formats concurrently; the first to return results wins and the other is cancelled"""
+    scraper = FastResultScraper(await _get_session())
+    
+    async def probe(url):
+        # gather() cancels its children when the probe itself is cancelled
+        results = await asyncio.gather(
+            *(scraper.fetch_single_result(url, reg_no) for reg_no in range(start_reg, end_reg + 1))
+        )
+        return [r for r in results if r]
+    
+    tasks = {asyncio.ensure_future(probe(url)): url for url in (url_primary, url_secondary)}
+    pending = set(tasks)
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if not task.cancelled() and task.exception() is None and task.result():
+                    return tasks[task]
+    finally:
+        for task in pending:
+            task.cancel()
+    # Neither format had results; fall back as the sequential probe did
+    return url_secondary
+
+async def fetch_all_results_batched_async(url_primary: str, url_secondary: str, start_reg: int, end_reg: int,
+                                          le_range: Optional[tuple] = None, progress_callback=None) -> tuple:
+    """Probe the URL format, then scrape the full range and any lateral-entry range, in one coroutine"""
+    used_url = await _race_probes(url_primary, url_secondary, start_reg, min(start_reg + 4, end_reg))
+    
+    if le_range:
+        # Regular and lateral-entry ranges share one batch instead of running back to back
+        results, le_results = await fetch_all_ranges_async(used_url, [(start_reg, end_reg), le_range], progress_callback)
+    else:
+        results = await fetch_all_results_async(used_url, start_reg, end_reg, progress_callback)
+        le_results = []
+    return results, used_url, le_results
 
-def fetch_all_results(base_url: str, start_reg: int, end_reg: int) -> List[Dict]:
-    """Wrapper function to run async scraper from sync context"""
+def _run_with_progress(make_coro):
+    """Run a scraper coroutine on the shared loop, drawing its progress on the script thread"""
     
     # Create progress placeholder
     progress_placeholder = st.empty()
     progress_bar = st.progress(0)
     status_placeholder = st.empty()
     
+    # Progress is reported from the scraper loop's thread and drawn here
+    progress_state = {}
+    
     def update_progress(completed, total, successful, failed):
+        progress_state["latest"] = (completed, total, successful, failed)
+    
+    def show_progress():
+        if "latest" not in progress_state:
+            return
+        completed, total, successful, failed = progress_state["latest"]
         progress = completed / total if total > 0 else 0
         progress_bar.progress(progress)
         
@@ -168,97 +336,56 @@ def fetch_all_results(base_url: str, start_reg: int, end_reg: int) -> List[Dict]
             f"| ✅ {successful} successful | ❌ {failed} failed"
         )
     
+    future = asyncio.run_coroutine_threadsafe(make_coro(update_progress), _get_loop())
     try:
-        # Run the async function
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        results = loop.run_until_complete(
-            fetch_all_results_async(base_url, start_reg, end_reg, update_progress)
-        )
-        loop.close()
+        while not future.done():
+            wait([future], timeout=0.1)
+            show_progress()
+        return future.result()
+    finally:
+        # A rerun or stop interrupts the poll above; don't leave the scrape running on the shared loop
+        if not future.done():
+            future.cancel()
         
         # Clear progress indicators
         progress_placeholder.empty()
         progress_bar.empty()
         status_placeholder.empty()
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def _fetch_all_results_batched_cached(url_primary: str, url_secondary: str, start_reg: int, end_reg: int,
+                                      le_range: Optional[tuple]) -> tuple:
+    """Probe, full and lateral-entry scrape for one form submission, memoized for an hour"""
+    results, used_url, le_results = _run_with_progress(
+        lambda progress: fetch_all_results_batched_async(
+            url_primary, url_secondary, start_reg, end_reg, le_range, progress
+        )
+    )
+    if not results:
+        # Don't memoize an empty scrape: it may be a transient outage
+        raise _NoResults()
+    return tuple(results), used_url, tuple(le_results)
+
+def fetch_all_results_batched(url_primary: str, url_secondary: str, start_reg: int, end_reg: int,
+                              le_range: Optional[tuple] = None) -> tuple:
+    """Fetch a form submission's results in one pass.
+
+    Returns (results, used_url, le_results); used_url is None when nothing was found.
+    """
+    try:
+        results, used_url, le_results = _fetch_all_results_batched_cached(
+            url_primary, url_secondary, start_reg, end_reg, le_range
+        )
+        return list(results), used_url, list(le_results)
         
-        return results
+    except _NoResults:
+        return [], None, []
         
     except Exception as e:
         st.error(f"Scraping failed: {e}")
-        progress_placeholder.empty()
-        progress_bar.empty()
-        status_placeholder.empty()
-        return []
-
-# Legacy sync function for compatibility (significantly optimized)
-def fetch_and_parse_result(base_url, registration_no, retries=2, backoff_factor=0.5):
-    """Optimized sync version with reduced retries and faster parsing"""
-    url = f"{base_url}{registration_no}"
-    
-    # Use session with connection pooling
-    session = requests.Session()
-    session.headers.update({
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-    })
-    
-    for attempt in range(retries):
-        try:
-            response = session.get(url, timeout=3)  # Reduced timeout
-            response.raise_for_status()
-            
-            # Use lxml parser for speed
-            soup = BeautifulSoup(response.text, "lxml")
-            
-            # Quick validation
-            if not soup.select_one("#ContentPlaceHolder1_DataList1_RegistrationNoLabel_0"):
-                return None
-                
-            result = {
-                "Registration No.": _safe_get_text(soup, "#ContentPlaceHolder1_DataList1_RegistrationNoLabel_0"),
-                "Student Name": _safe_get_text(soup, "#ContentPlaceHolder1_DataList1_StudentNameLabel_0"),
-                "Father's Name": _safe_get_text(soup, "#ContentPlaceHolder1_DataList1_FatherNameLabel_0"),
-                "Mother's Name": _safe_get_text(soup, "#ContentPlaceHolder1_DataList1_MotherNameLabel_0"),
-                "Current SGPA": _safe_get_text(soup, "#ContentPlaceHolder1_DataList5_GROSSTHEORYTOTALLabel_0")
-            }
-            
-            # Optimized table parsing
-            table = soup.select_one("#ContentPlaceHolder1_GridView3")
-            if table:
-                rows = table.select("tr")
-                if len(rows) >= 2:
-                    headers = [th.get_text(strip=True) for th in rows[0].find_all("th")]
-                    values = [td.get_text(strip=True) for td in rows[1].find_all("td")]
-                    for header, value in zip(headers, values):
-                        if header and value:
-                            result[f"Sem {header}"] = value
-            
-            session.close()
-            return result
-            
-        except Exception as e:
-            if attempt < retries - 1:
-                time.sleep(backoff_factor * (attempt + 1))
-            else:
-                session.close()
-                return None
-
-def _safe_get_text(soup, selector, default="N/A"):
-    """Helper function for safe text extraction"""
-    try:
-        element = soup.select_one(selector)
-        return element.get_text(strip=True) if element else default
-    except:
-        return default
-
-# Optimized sorting functions with caching
-@functools.lru_cache(maxsize=128)
-def sort_by_current_cgpa(df_hash):
-    """Cached sorting function"""
-    df = pd.read_json(df_hash)
-    df["Sem Cur. CGPA"] = pd.to_numeric(df["Sem Cur. CGPA"], errors="coerce")
-    return df.sort_values(by="Sem Cur. CGPA", ascending=False)
+        return [], None, []
 
+# Optimized sorting functions
 def sort_by_latest_semester_grade(df):
     """Optimized semester grade sorting"""
     sem_columns = [col for col in df.columns if col.startswith("Sem ")]